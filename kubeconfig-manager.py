@@ -4,40 +4,368 @@ Kubeconfig Manager - A CLI tool for managing Kubernetes configurations
 """
 
 import os
+import re
+import errno
 import sys
-import json
-import shutil
+import copy
+import weakref
 import click
-import yaml
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+# PyYAML and the JSON backend are resolved on first use (see import_yaml and
+# import_json) so commands that never touch them start faster. They stay None
+# until then: module helpers that use them directly (emit_scalar, emit_block,
+# emit_inline) rely on their entry point (emit_kubeconfig, the manager methods)
+# having called import_yaml() first.
+yaml = None
+_Loader = _Dumper = None
+json_loads = json_dumps = None
+
+
+def import_yaml():
+    """Import PyYAML, preferring the libyaml-backed C loader/dumper when available"""
+    global yaml, _Loader, _Dumper
+    if yaml is not None:
+        return
+
+    import yaml as yaml_module
+    try:
+        from yaml import CSafeLoader as loader, CSafeDumper as dumper
+    except ImportError:
+        from yaml import SafeLoader as loader, SafeDumper as dumper
+
+    class KubeconfigDumper(dumper):
+        """Dumper that skips anchor detection; kubeconfigs never need aliases"""
+
+        def ignore_aliases(self, data) -> bool:
+            return True
+
+    yaml, _Loader, _Dumper = yaml_module, loader, KubeconfigDumper
+
+
+def import_json():
+    """Resolve the JSON backend for profile metadata, preferring orjson when installed"""
+    global json_loads, json_dumps
+    if json_loads is not None:
+        return
+
+    try:
+        import orjson
+
+        def dumps(obj) -> bytes:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+        json_loads, json_dumps = orjson.loads, dumps
+    except ImportError:
+        import json
+
+        def dumps(obj) -> bytes:
+            return json.dumps(obj, indent=2).encode()
+
+        json_loads, json_dumps = json.loads, dumps
+
+
+# Maximum number of parsed kubeconfigs kept in memory per manager
+CONFIG_CACHE_SIZE = 16
+
+# Emitter settings for saved kubeconfigs: never wrap long scalars, write UTF-8
+# as-is and keep the key order of the merged config
+YAML_DUMP_OPTIONS = {
+    "default_flow_style": False,
+    "width": 2**31 - 1,
+    "allow_unicode": True,
+    "sort_keys": False,
+}
+
+# Set KCM_FSYNC=0 to skip fsync on writes, trading durability for speed
+FSYNC_WRITES = os.environ.get("KCM_FSYNC", "1") != "0"
+
+# Top-level current-context line, rewritten in place when switching contexts
+CURRENT_CONTEXT_RE = re.compile(rb"^current-context:[^\r\n]*", re.MULTILINE)
+
+# Backup file names, config_backup_YYYYmmdd_HHMMSS
+BACKUP_NAME_RE = re.compile(r"^config_backup_(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})$")
+
+# Strings that can be written unquoted in block context, provided the YAML
+# resolver would also read them back as strings (not bools, numbers, ...)
+PLAIN_SCALAR_RE = re.compile(r"[A-Za-z0-9_./][A-Za-z0-9_./@+=-]*(?::[A-Za-z0-9_./@+=-]+)*")
+
+# Named kubeconfig sections, keyed by the conflict type reported for them
+SECTIONS = {"cluster": "clusters", "user": "users", "context": "contexts"}
+
+
+@contextmanager
+def atomic_open(path: Path, mode: str = "w", encoding: Optional[str] = None):
+    """Open a temporary sibling of path that atomically replaces it on success
+
+    Symlinks are followed so the file they point to is replaced, not the link.
+    The temporary file is private (0600) until it takes over the mode and,
+    where permitted, the owner of the file it replaces.
+    """
+    import tempfile
+
+    target = os.path.realpath(path)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            if FSYNC_WRITES:
+                os.fsync(f.fileno())
+        # Keep the permissions and owner of the file being replaced (kubeconfigs
+        # hold credentials, and may be rewritten by root on a user's behalf)
+        try:
+            st = os.stat(target)
+        except FileNotFoundError:
+            pass
+        else:
+            try:
+                os.chown(tmp_path, st.st_uid, st.st_gid)
+            except PermissionError:
+                pass
+            os.chmod(tmp_path, st.st_mode & 0o7777)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def kernel_copy(in_fd: int, out_fd: int, size: int) -> bool:
+    """Copy size bytes between file descriptors in-kernel, returning False if unsupported"""
+    copiers = []
+    if hasattr(os, "copy_file_range"):
+        # Can share extents (reflink) on copy-on-write filesystems such as btrfs/xfs
+        copiers.append(lambda count: os.copy_file_range(in_fd, out_fd, count))
+    if hasattr(os, "sendfile"):
+        copiers.append(lambda count: os.sendfile(out_fd, in_fd, None, count))
+
+    for copy_chunk in copiers:
+        remaining = size
+        try:
+            while remaining > 0:
+                copied = copy_chunk(remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            if remaining <= 0:
+                return True
+        except OSError:
+            # e.g. EXDEV/ENOSYS on older kernels
+            pass
+        # Some filesystems report 0 bytes copied instead of failing; rewind and
+        # try the next method either way
+        os.lseek(in_fd, 0, os.SEEK_SET)
+        os.lseek(out_fd, 0, os.SEEK_SET)
+        os.ftruncate(out_fd, 0)
+    return False
+
+
+def copy_data(fsrc, fdst):
+    """Copy the contents of one freshly opened binary file object into another"""
+    import shutil
+
+    if not kernel_copy(fsrc.fileno(), fdst.fileno(), os.fstat(fsrc.fileno()).st_size):
+        shutil.copyfileobj(fsrc, fdst)
+
+
+class EmitterFallback(Exception):
+    """Raised when a config holds something emit_kubeconfig does not handle"""
+
+
+def emit_scalar(value, resolver) -> str:
+    """Render a scalar exactly as the YAML dumper would on a single line"""
+    if value is None:
+        return "null"
+    if type(value) is bool:
+        return "true" if value else "false"
+    if type(value) is int:
+        return str(value)
+    if type(value) is not str:
+        raise EmitterFallback(type(value).__name__)
+
+    # Like the dumper, never write document markers ("---", "...") as plain scalars
+    if PLAIN_SCALAR_RE.fullmatch(value) and not value.startswith(("---", "...")) and (
+        resolver.resolve(yaml.ScalarNode, value, (True, False)) == "tag:yaml.org,2002:str"
+    ):
+        return value
+
+    # Anything that needs quoting goes through the real dumper
+    text = yaml.dump(value, Dumper=_Dumper, **YAML_DUMP_OPTIONS)
+    if text.endswith("\n...\n"):
+        text = text[:-4]
+    text = text[:-1]
+    if any(ch in text for ch in "\r\n\x85\u2028\u2029"):
+        raise EmitterFallback("multi-line scalar")
+    return text
+
+
+def emit_block(value, indent: int, resolver) -> List[str]:
+    """Render a non-empty mapping or sequence in block style, one entry per line"""
+    pad = " " * indent
+    lines = []
+    if type(value) is dict:
+        for key, item in value.items():
+            if type(key) is not str or len(key) > 128 or not PLAIN_SCALAR_RE.fullmatch(key):
+                raise EmitterFallback("complex key")
+            key = emit_scalar(key, resolver)
+            if item and type(item) is dict:
+                lines.append(f"{pad}{key}:")
+                lines.extend(emit_block(item, indent + 2, resolver))
+            elif item and type(item) is list:
+                # Sequences inside mappings are not indented further
+                lines.append(f"{pad}{key}:")
+                lines.extend(emit_block(item, indent, resolver))
+            else:
+                lines.append(f"{pad}{key}: {emit_inline(item, resolver)}")
+    else:
+        for item in value:
+            if item and type(item) in (dict, list):
+                nested = emit_block(item, indent + 2, resolver)
+                nested[0] = f"{pad}- {nested[0][indent + 2:]}"
+                lines.extend(nested)
+            else:
+                lines.append(f"{pad}- {emit_inline(item, resolver)}")
+    return lines
+
+
+def emit_inline(value, resolver) -> str:
+    """Render a scalar or an empty collection"""
+    if type(value) is dict:
+        return "{}"
+    if type(value) is list:
+        return "[]"
+    return emit_scalar(value, resolver)
+
+
+def emit_kubeconfig(config: Dict) -> Optional[str]:
+    """Serialize a kubeconfig without going through the generic YAML emitter
+
+    Kubeconfigs are plain trees of mappings, lists and strings, so they can be
+    written directly. The output matches yaml.dump with YAML_DUMP_OPTIONS;
+    None is returned for anything outside that subset so the caller can fall
+    back to the dumper.
+    """
+    import_yaml()
+    if type(config) is not dict:
+        return None
+    if not config:
+        return "{}\n"
+    try:
+        return "\n".join(emit_block(config, 0, yaml.resolver.Resolver())) + "\n"
+    except EmitterFallback:
+        return None
+
+
+def root_entry_spans(data: bytes, key: str) -> Optional[List[Tuple]]:
+    """Find the entries for key in the root mapping of a YAML document
+
+    Returns the (key start, value end) marks of each matching entry, or None
+    when the root is not a block mapping. Only parser events are produced; no
+    nodes or values are constructed.
+    """
+    import_yaml()
+    spans = []
+    depth = 0
+    at_key = True
+    key_event = node_start = None
+    for event in yaml.parse(data, Loader=_Loader):
+        if isinstance(event, yaml.CollectionEndEvent):
+            depth -= 1
+            if depth == 0:
+                break
+        elif isinstance(event, yaml.NodeEvent):
+            if depth == 0:
+                if not isinstance(event, yaml.MappingStartEvent) or event.flow_style:
+                    return None
+                depth = 1
+                continue
+            if depth == 1:
+                node_start = event
+            if isinstance(event, yaml.CollectionStartEvent):
+                depth += 1
+        else:
+            continue
+
+        # A node directly under the root mapping is complete; keys and values alternate
+        if depth != 1:
+            continue
+        if at_key:
+            key_event = node_start
+        elif isinstance(key_event, yaml.ScalarEvent) and key_event.value == key:
+            spans.append((key_event.start_mark, event.end_mark))
+        at_key = not at_key
+    return spans
+
+
+def write_pending_profiles(profiles_config: Path, pending: Dict):
+    """Write profile data queued by KubeconfigManager.save_profiles, if any"""
+    if "data" not in pending:
+        return
+
+    import_json()
+    profiles_config.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_open(profiles_config, "wb") as f:
+        f.write(json_dumps(pending["data"]))
+    del pending["data"]
+
 
 class KubeconfigManager:
+    __slots__ = (
+        "default_config_path",
+        "backup_dir",
+        "profiles_dir",
+        "profiles_config",
+        "_config_cache",
+        "_profiles_cache",
+        "_pending_profiles",
+        "_current_profile",
+        "_backup_dir_ready",
+        "__weakref__",
+    )
+
     def __init__(self):
         self.default_config_path = Path.home() / ".kube" / "config"
         self.backup_dir = Path.home() / ".kube" / "backups"
         self.profiles_dir = Path.home() / ".kube" / "profiles"
         self.profiles_config = self.profiles_dir / "profiles.json"
-        self.backup_dir.mkdir(parents=True, exist_ok=True)
-        self.profiles_dir.mkdir(parents=True, exist_ok=True)
+        self._config_cache = OrderedDict()
+        self._profiles_cache = None
+        self._pending_profiles = {}
+        self._current_profile = None
+        self._backup_dir_ready = False
+        # Flush when the manager is collected or at exit; the finalizer only
+        # holds the pending profile data, not the manager and its caches
+        weakref.finalize(self, write_pending_profiles, self.profiles_config, self._pending_profiles)
         
     def get_profiles(self) -> Dict:
         """Load profile configuration"""
-        if not self.profiles_config.exists():
-            return {"profiles": {}, "current_profile": "default"}
+        if self._profiles_cache is None:
+            import_json()
+            try:
+                self._profiles_cache = json_loads(self.profiles_config.read_bytes())
+            except (ValueError, FileNotFoundError):
+                self._profiles_cache = {"profiles": {}, "current_profile": "default"}
         
-        try:
-            with open(self.profiles_config, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {"profiles": {}, "current_profile": "default"}
+        return copy.deepcopy(self._profiles_cache)
     
     def save_profiles(self, profiles_data: Dict):
-        """Save profile configuration"""
-        with open(self.profiles_config, "w") as f:
-            json.dump(profiles_data, f, indent=2)
+        """Save profile configuration (written to disk on flush)"""
+        self._profiles_cache = copy.deepcopy(profiles_data)
+        self._pending_profiles["data"] = self._profiles_cache
+        self._current_profile = None
+    
+    def flush(self):
+        """Write pending profile changes to disk"""
+        write_pending_profiles(self.profiles_config, self._pending_profiles)
     
     def get_profile_config_path(self, profile_name: str) -> Path:
         """Get the config path for a specific profile"""
@@ -81,8 +409,10 @@ class KubeconfigManager:
     
     def get_current_profile(self) -> str:
         """Get the current active profile"""
-        profiles_data = self.get_profiles()
-        return profiles_data.get("current_profile", "default")
+        if self._current_profile is None:
+            profiles_data = self.get_profiles()
+            self._current_profile = profiles_data.get("current_profile", "default")
+        return self._current_profile
     
     def get_current_config_path(self) -> Path:
         """Get the config path for the current profile"""
@@ -91,51 +421,55 @@ class KubeconfigManager:
     
     def detect_conflicts(self, base_config: Dict, new_config: Dict) -> List[Dict]:
         """Detect conflicts between configurations"""
+        return self.merge_and_detect(base_config, new_config)[1]
+    
+    def merge_section(self, base_items: List[Dict], new_items: List[Dict], conflict_type: str) -> Tuple[List[Dict], List[Dict]]:
+        """Merge one named section, collecting conflicts in the same pass"""
+        new_by_name = {item["name"]: item for item in new_items if item.get("name")}
+        if not base_items:
+            # Nothing to merge into or conflict with, e.g. adding to a new config
+            return list(new_by_name.values()), []
+
+        base_by_name = {item["name"]: item for item in base_items if item.get("name")}
+
+        conflicts = [
+            {
+                "type": conflict_type,
+                "name": name,
+                "base": base_by_name[name],
+                "new": item
+            }
+            for name, item in new_by_name.items()
+            if name in base_by_name and item != base_by_name[name]
+        ]
+
+        merged = dict(base_by_name)
+        merged.update(new_by_name)
+        return list(merged.values()), conflicts
+    
+    def merge_and_detect(self, base_config: Dict, new_config: Dict) -> Tuple[Dict, List[Dict]]:
+        """Merge two kubeconfig files and report the conflicts between them"""
+        merged = {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [],
+            "users": [],
+            "contexts": [],
+            "current-context": base_config.get("current-context", ""),
+        }
         conflicts = []
-        
-        # Check for cluster conflicts
-        base_clusters = {c.get("name"): c for c in base_config.get("clusters", [])}
-        for cluster in new_config.get("clusters", []):
-            cluster_name = cluster.get("name")
-            if cluster_name in base_clusters:
-                base_cluster = base_clusters[cluster_name]
-                if cluster != base_cluster:
-                    conflicts.append({
-                        "type": "cluster",
-                        "name": cluster_name,
-                        "base": base_cluster,
-                        "new": cluster
-                    })
-        
-        # Check for user conflicts
-        base_users = {u.get("name"): u for u in base_config.get("users", [])}
-        for user in new_config.get("users", []):
-            user_name = user.get("name")
-            if user_name in base_users:
-                base_user = base_users[user_name]
-                if user != base_user:
-                    conflicts.append({
-                        "type": "user",
-                        "name": user_name,
-                        "base": base_user,
-                        "new": user
-                    })
-        
-        # Check for context conflicts
-        base_contexts = {c.get("name"): c for c in base_config.get("contexts", [])}
-        for context in new_config.get("contexts", []):
-            context_name = context.get("name")
-            if context_name in base_contexts:
-                base_context = base_contexts[context_name]
-                if context != base_context:
-                    conflicts.append({
-                        "type": "context",
-                        "name": context_name,
-                        "base": base_context,
-                        "new": context
-                    })
-        
-        return conflicts
+
+        for conflict_type, section in SECTIONS.items():
+            merged[section], section_conflicts = self.merge_section(
+                base_config.get(section, ()), new_config.get(section, ()), conflict_type
+            )
+            conflicts.extend(section_conflicts)
+
+        # Use new config's current-context if it exists
+        if new_config.get("current-context"):
+            merged["current-context"] = new_config["current-context"]
+
+        return merged, conflicts
     
     def preview_merge(self, base_config: Dict, new_config: Dict) -> Dict:
         """Preview what the merged config would look like"""
@@ -151,10 +485,12 @@ class KubeconfigManager:
         if len(context_names) == 1:
             return context_names[0]
         
+        contexts_by_name = {ctx["name"]: ctx for ctx in contexts if ctx.get("name")}
+        lowered_names = [name.lower() for name in context_names]
+        
         click.echo("\n🔍 Select a context:")
         for i, name in enumerate(context_names, 1):
-            ctx = next(c for c in contexts if c.get("name") == name)
-            cluster = ctx.get("context", {}).get("cluster", "Unknown")
+            cluster = contexts_by_name[name].get("context", {}).get("cluster", "Unknown")
             click.echo(f"  {i}. {name} (cluster: {cluster})")
         
         while True:
@@ -170,7 +506,10 @@ class KubeconfigManager:
                     pass
                 
                 # Try as context name or partial match
-                matches = [name for name in context_names if choice.lower() in name.lower()]
+                needle = choice.lower()
+                matches = [
+                    name for name, lowered in zip(context_names, lowered_names) if needle in lowered
+                ]
                 if len(matches) == 1:
                     return matches[0]
                 elif len(matches) > 1:
@@ -186,114 +525,245 @@ class KubeconfigManager:
     def apply_conflict_resolutions(self, base_config: Dict, new_config: Dict, conflicts: List[Dict]) -> Dict:
         """Apply conflict resolutions based on user choices"""
         merged = self.merge_configs(base_config, new_config)
-        
+        self.resolve_conflicts(merged, conflicts)
+        return merged
+
+    def resolve_conflicts(self, merged: Dict, conflicts: List[Dict]):
+        """Apply conflict resolutions in place to an already merged config"""
+        # Index each section by name once so every resolution is a single lookup
+        positions = {
+            conflict_type: {item.get("name"): i for i, item in enumerate(merged[section])}
+            for conflict_type, section in SECTIONS.items()
+        }
+
         for conflict in conflicts:
             if conflict.get('resolution') == 'base':
                 # Keep the base version
-                if conflict['type'] == 'cluster':
-                    clusters = [c for c in merged['clusters'] if c.get('name') != conflict['name']]
-                    clusters.append(conflict['base'])
-                    merged['clusters'] = clusters
-                elif conflict['type'] == 'user':
-                    users = [u for u in merged['users'] if u.get('name') != conflict['name']]
-                    users.append(conflict['base'])
-                    merged['users'] = users
-                elif conflict['type'] == 'context':
-                    contexts = [c for c in merged['contexts'] if c.get('name') != conflict['name']]
-                    contexts.append(conflict['base'])
-                    merged['contexts'] = contexts
-        
-        return merged
+                items = merged[SECTIONS[conflict['type']]]
+                index = positions[conflict['type']].get(conflict['name'])
+                if index is None:
+                    items.append(conflict['base'])
+                else:
+                    items[index] = conflict['base']
+
+    def load_config(self, config_path: Path, require_exists: bool = False) -> Dict:
+        """Load a kubeconfig file, reusing the parsed result while it is unchanged
 
-    def load_config(self, config_path: Path) -> Dict:
-        """Load a kubeconfig file"""
+        A missing file loads as an empty config unless require_exists is set.
+        """
+        import_yaml()
         try:
-            with open(config_path, "r") as f:
-                return yaml.safe_load(f) or {}
+            st = os.stat(config_path)
+            cache_key = (str(config_path), st.st_mtime_ns, st.st_size)
+            if cache_key in self._config_cache:
+                self._config_cache.move_to_end(cache_key)
+                return copy.deepcopy(self._config_cache[cache_key])
+
+            # Parse from one string rather than letting the reader pull chunks
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = yaml.load(f.read(), Loader=_Loader) or {}
         except FileNotFoundError:
+            if require_exists:
+                raise click.ClickException(f"Config file not found: {config_path}")
             return {"clusters": [], "users": [], "contexts": [], "current-context": ""}
         except yaml.YAMLError as e:
             raise click.ClickException(f"Error parsing YAML in {config_path}: {e}")
 
+        # Cache a private copy so callers are free to mutate what they get back
+        self._config_cache[cache_key] = copy.deepcopy(config)
+        if len(self._config_cache) > CONFIG_CACHE_SIZE:
+            self._config_cache.popitem(last=False)
+        return config
+
+    def invalidate_config_cache(self, config_path: Path):
+        """Drop any cached parse results for a config file"""
+        path_str = str(config_path)
+        for cache_key in [k for k in self._config_cache if k[0] == path_str]:
+            del self._config_cache[cache_key]
+
     def save_config(self, config: Dict, config_path: Path):
         """Save a kubeconfig file"""
+        import_yaml()
+        self.invalidate_config_cache(config_path)
         config_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(config_path, "w") as f:
-            yaml.dump(config, f, default_flow_style=False)
+        # Emit into memory first so the file sees one write instead of one per event
+        data = emit_kubeconfig(config)
+        if data is None:
+            data = yaml.dump(config, Dumper=_Dumper, **YAML_DUMP_OPTIONS)
+        with atomic_open(config_path, encoding="utf-8") as f:
+            f.write(data)
         click.echo(f"✅ Saved config to {config_path}")
 
+    def ensure_backup_dir(self):
+        """Create the backup directory the first time a backup is written"""
+        if not self._backup_dir_ready:
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+            self._backup_dir_ready = True
+
+    def new_backup_path(self) -> Path:
+        """Get a timestamped path for a new backup"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.ensure_backup_dir()
+        return self.backup_dir / f"config_backup_{timestamp}"
+
     def backup_config(self, config_path: Path) -> Path:
-        """Create a backup of the current config"""
-        if not config_path.exists():
+        """Create a backup of the current config, or return None if there is none"""
+        import shutil
+
+        # Open the config first so the backup directory is only created when needed
+        try:
+            fsrc = open(config_path, "rb")
+        except FileNotFoundError:
             return None
+        with fsrc:
+            backup_path = self.new_backup_path()
+            with open(backup_path, "wb") as fdst:
+                copy_data(fsrc, fdst)
+        shutil.copystat(config_path, backup_path)
+        return backup_path
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = self.backup_dir / f"config_backup_{timestamp}"
-        shutil.copy2(config_path, backup_path)
+    def link_to_backup(self, config_path: Path) -> Optional[Path]:
+        """Back up a config that is about to be replaced by hard-linking it
+
+        No data is copied: the backup keeps the current file, so the caller
+        must install the new config as a new file (see atomic_open) rather
+        than write into it. Falls back to backup_config where linking fails.
+        """
+        source = os.path.realpath(config_path)
+        try:
+            os.stat(source)
+        except FileNotFoundError:
+            return None
+
+        backup_path = self.new_backup_path()
+        try:
+            os.link(source, backup_path)
+        except FileNotFoundError:
+            return self.backup_config(config_path)
+        except OSError as e:
+            # Other filesystems, no hard link support, or a backup from the same second
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EEXIST, errno.ENOTSUP):
+                raise
+            return self.backup_config(config_path)
         return backup_path
 
     def merge_configs(self, base_config: Dict, new_config: Dict) -> Dict:
         """Merge two kubeconfig files"""
-        merged = {
-            "apiVersion": "v1",
-            "kind": "Config",
-            "clusters": [],
-            "users": [],
-            "contexts": [],
-            "current-context": base_config.get("current-context", ""),
-        }
+        return self.merge_and_detect(base_config, new_config)[0]
 
-        # Merge clusters
-        existing_clusters = {
-            c.get("name"): c for c in base_config.get("clusters", []) if c.get("name")
-        }
-        for cluster in new_config.get("clusters", []):
-            if cluster.get("name"):
-                existing_clusters[cluster.get("name")] = cluster
-        merged["clusters"] = list(existing_clusters.values())
-
-        # Merge users
-        existing_users = {
-            u.get("name"): u for u in base_config.get("users", []) if u.get("name")
-        }
-        for user in new_config.get("users", []):
-            if user.get("name"):
-                existing_users[user.get("name")] = user
-        merged["users"] = list(existing_users.values())
-
-        # Merge contexts
-        existing_contexts = {
-            c.get("name"): c for c in base_config.get("contexts", []) if c.get("name")
-        }
-        for context in new_config.get("contexts", []):
-            if context.get("name"):
-                existing_contexts[context.get("name")] = context
-        merged["contexts"] = list(existing_contexts.values())
+    def inspect_config(self, config_path: Path) -> Dict:
+        """Summarize a kubeconfig from its YAML node graph without constructing it
 
-        # Use new config's current-context if it exists
-        if new_config.get("current-context"):
-            merged["current-context"] = new_config["current-context"]
+        Returns "fields", mapping each top-level key to its number of entries
+        (or its value, for scalars), plus the "context_names" and the
+        "current-context".
+        """
+        import_yaml()
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                root = yaml.compose(f.read(), Loader=_Loader)
+        except yaml.YAMLError as e:
+            raise click.ClickException(f"Error parsing YAML in {config_path}: {e}")
 
-        return merged
+        summary = {"fields": {}, "context_names": [], "current-context": None}
+        if not isinstance(root, yaml.MappingNode):
+            return summary
+
+        # Only scalars are ever constructed; collections are just counted. Merge
+        # keys (<<) are expanded first so mappings see the entries they inherit
+        constructor = yaml.constructor.SafeConstructor()
+        constructor.flatten_mapping(root)
+        for key_node, value_node in root.value:
+            key = key_node.value
+            if isinstance(value_node, yaml.CollectionNode):
+                summary["fields"][key] = len(value_node.value)
+            else:
+                summary["fields"][key] = constructor.construct_document(value_node)
+
+            if key == "current-context":
+                summary["current-context"] = summary["fields"][key]
+            elif key == "contexts" and isinstance(value_node, yaml.SequenceNode):
+                names = []
+                for context_node in value_node.value:
+                    name = None
+                    if isinstance(context_node, yaml.MappingNode):
+                        constructor.flatten_mapping(context_node)
+                        for item_key, item_value in context_node.value:
+                            if item_key.value == "name":
+                                name = constructor.construct_document(item_value)
+                    names.append(name)
+                summary["context_names"] = names
+
+        return summary
 
     def list_contexts(self, config_path: Path = None) -> List[Dict]:
         """List all contexts in a config file"""
         if config_path is None:
             config_path = self.default_config_path
 
-        config = self.load_config(config_path)
-        return config.get("contexts", [])
+        return self.load_config(config_path).get("contexts", [])
+
+    def set_current_context_inplace(self, config_path: Path, context_name: str) -> bool:
+        """Rewrite just the top-level current-context line of a kubeconfig
+
+        Returns False, leaving the file untouched, when the line cannot be
+        replaced safely and the caller has to re-serialize the whole config.
+        """
+        import_yaml()
+        try:
+            data = config_path.read_bytes()
+        except FileNotFoundError:
+            return False
+
+        matches = list(CURRENT_CONTEXT_RE.finditer(data))
+        if len(matches) != 1:
+            return False
+        match = matches[0]
+
+        line = yaml.dump({"current-context": context_name}, Dumper=_Dumper, **YAML_DUMP_OPTIONS)
+        line = line.rstrip("\n").encode("utf-8")
+        if b"\n" in line:
+            return False
+
+        # The matched line must hold the whole root current-context entry, rather
+        # than a line inside a multi-line scalar or flow collection; the old value
+        # must also not carry an anchor that later aliases refer to
+        line_number = data.count(b"\n", 0, match.start())
+        try:
+            spans = root_entry_spans(data, "current-context")
+            if spans is None or len(spans) != 1:
+                return False
+            key_start, value_end = spans[0]
+            if (key_start.line, key_start.column, value_end.line) != (line_number, 0, line_number):
+                return False
+            for event in yaml.parse(match.group(0), Loader=_Loader):
+                if getattr(event, "anchor", None) is not None:
+                    return False
+            old_entry = yaml.load(match.group(0), Loader=_Loader)
+            if not isinstance(old_entry, dict) or list(old_entry) != ["current-context"]:
+                return False
+            if yaml.load(line, Loader=_Loader) != {"current-context": context_name}:
+                return False
+        except yaml.YAMLError:
+            return False
+        updated = data[:match.start()] + line + data[match.end():]
+
+        self.invalidate_config_cache(config_path)
+        with atomic_open(config_path, "wb") as f:
+            f.write(updated)
+        click.echo(f"✅ Saved config to {config_path}")
+        return True
 
     def switch_context(self, context_name: str, config_path: Path = None):
         """Switch to a different context"""
         if config_path is None:
             config_path = self.default_config_path
 
-        config = self.load_config(config_path)
-        contexts = [c.get("name") for c in config.get("contexts", [])]
+        config = self.load_config(config_path, require_exists=True)
+        context_names = {c["name"] for c in config.get("contexts", ()) if c.get("name")}
 
-        if context_name not in contexts:
-            available = ", ".join(contexts) if contexts else "No contexts available"
+        if context_name not in context_names:
+            available = ", ".join(sorted(context_names)) or "No contexts available"
             raise click.ClickException(
                 f"Context '{context_name}' not found. Available: {available}"
             )
@@ -303,11 +773,22 @@ class KubeconfigManager:
         if backup_path:
             click.echo(f"📦 Backup created: {backup_path}")
 
-        config["current-context"] = context_name
-        self.save_config(config, config_path)
+        if not self.set_current_context_inplace(config_path, context_name):
+            config = self.load_config(config_path)
+            config["current-context"] = context_name
+            self.save_config(config, config_path)
         click.echo(f"🔄 Switched to context: {context_name}")
 
 
+def get_manager() -> KubeconfigManager:
+    """Create a manager whose pending changes are flushed when the command finishes"""
+    manager = KubeconfigManager()
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None:
+        ctx.call_on_close(manager.flush)
+    return manager
+
+
 @click.group()
 @click.version_option(version="1.0.0")
 def cli():
@@ -329,7 +810,7 @@ def cli():
 @click.option("--interactive", "-i", is_flag=True, help="Interactive conflict resolution")
 def add(config_file, target, profile, backup, dry_run, interactive):
     """Add a new kubeconfig file to your existing configuration"""
-    manager = KubeconfigManager()
+    manager = get_manager()
 
     # Determine target config path
     if profile:
@@ -352,8 +833,8 @@ def add(config_file, target, profile, backup, dry_run, interactive):
     base_config = manager.load_config(target)
     new_config = manager.load_config(config_file)
 
-    # Detect conflicts
-    conflicts = manager.detect_conflicts(base_config, new_config)
+    # Merge and detect conflicts in a single pass
+    merged_config, conflicts = manager.merge_and_detect(base_config, new_config)
     
     if conflicts:
         click.echo(f"\n⚠️  Found {len(conflicts)} conflicts:")
@@ -374,12 +855,9 @@ def add(config_file, target, profile, backup, dry_run, interactive):
                 click.echo("❌ Operation cancelled")
                 return
 
-    # Preview merge
-    merged_config = manager.preview_merge(base_config, new_config)
-    
     # Apply conflict resolutions if interactive mode
     if interactive and conflicts:
-        merged_config = manager.apply_conflict_resolutions(base_config, new_config, conflicts)
+        manager.resolve_conflicts(merged_config, conflicts)
 
     # Show preview
     click.echo("\n📊 Preview:")
@@ -392,8 +870,8 @@ def add(config_file, target, profile, backup, dry_run, interactive):
         click.echo("\n🔍 Dry run complete - no changes made")
         return
 
-    # Create backup if requested and target exists
-    if backup and target.exists():
+    # Create backup if requested (nothing is backed up if the target doesn't exist)
+    if backup:
         backup_path = manager.backup_config(target)
         if backup_path:
             click.echo(f"\n📦 Backup created: {backup_path}")
@@ -409,24 +887,20 @@ def add(config_file, target, profile, backup, dry_run, interactive):
 )
 def list_contexts_cmd(config):
     """List all available contexts"""
-    manager = KubeconfigManager()
+    manager = get_manager()
 
     config_path = Path(config) if config else manager.default_config_path
 
-    if not config_path.exists():
-        click.echo("❌ No kubeconfig file found")
-        return
-
-    contexts = manager.list_contexts(config_path)
+    config_data = manager.load_config(config_path, require_exists=True)
+    contexts = config_data.get("contexts", [])
 
     if not contexts:
         click.echo("❌ No contexts found in config")
         return
 
-    config_data = manager.load_config(config_path)
     current_context = config_data.get("current-context", "")
 
-    click.echo(f"📋 Contexts in {config_path}:\n")
+    lines = [f"📋 Contexts in {config_path}:", ""]
 
     for context in contexts:
         name = context.get("name", "Unknown")
@@ -435,11 +909,13 @@ def list_contexts_cmd(config):
         namespace = context.get("context", {}).get("namespace", "default")
 
         marker = "👉" if name == current_context else "  "
-        click.echo(f"{marker} {name}")
-        click.echo(f"     Cluster: {cluster}")
-        click.echo(f"     User: {user}")
-        click.echo(f"     Namespace: {namespace}")
-        click.echo()
+        lines.append(f"{marker} {name}")
+        lines.append(f"     Cluster: {cluster}")
+        lines.append(f"     User: {user}")
+        lines.append(f"     Namespace: {namespace}")
+        lines.append("")
+
+    click.echo("\n".join(lines))
 
 
 @cli.command()
@@ -451,7 +927,7 @@ def list_contexts_cmd(config):
 @click.option("--interactive", "-i", is_flag=True, help="Interactive context selection")
 def switch(context_name, config, profile, interactive):
     """Switch to a different context"""
-    manager = KubeconfigManager()
+    manager = get_manager()
 
     # Determine config path
     if profile:
@@ -463,12 +939,10 @@ def switch(context_name, config, profile, interactive):
     else:
         config_path = manager.get_current_config_path()
 
-    if not config_path.exists():
-        raise click.ClickException(f"Config file not found: {config_path}")
-
     # Interactive mode or direct switch
     if interactive or not context_name:
-        contexts = manager.list_contexts(config_path)
+        config_data = manager.load_config(config_path, require_exists=True)
+        contexts = config_data.get("contexts", [])
         if not contexts:
             click.echo("❌ No contexts available")
             return
@@ -482,15 +956,16 @@ def switch(context_name, config, profile, interactive):
         else:
             # Show available contexts
             current_profile = manager.get_current_profile()
-            click.echo(f"\n📋 Available contexts in profile '{current_profile}':")
-            config_data = manager.load_config(config_path)
             current_context = config_data.get("current-context", "")
+            lines = [f"\n📋 Available contexts in profile '{current_profile}':"]
             
             for ctx in contexts:
                 name = ctx.get("name", "Unknown")
                 cluster = ctx.get("context", {}).get("cluster", "Unknown")
                 marker = "👉" if name == current_context else "  "
-                click.echo(f"{marker} {name} (cluster: {cluster})")
+                lines.append(f"{marker} {name} (cluster: {cluster})")
+            
+            click.echo("\n".join(lines))
             return
 
     manager.switch_context(context_name, config_path)
@@ -500,21 +975,18 @@ def switch(context_name, config, profile, interactive):
 @click.option("--config", "-c", type=click.Path(), help="Config file to validate")
 def validate(config):
     """Validate a kubeconfig file"""
-    manager = KubeconfigManager()
+    manager = get_manager()
 
     config_path = Path(config) if config else manager.default_config_path
 
-    if not config_path.exists():
-        click.echo(f"❌ Config file not found: {config_path}")
-        return
-
     try:
-        config_data = manager.load_config(config_path)
+        summary = manager.inspect_config(config_path)
+        fields = summary["fields"]
 
         # Basic validation
         required_fields = ["clusters", "users", "contexts"]
         missing_fields = [
-            field for field in required_fields if field not in config_data
+            field for field in required_fields if field not in fields
         ]
 
         if missing_fields:
@@ -522,14 +994,14 @@ def validate(config):
             return
 
         # Check for empty sections
-        empty_sections = [field for field in required_fields if not config_data[field]]
+        empty_sections = [field for field in required_fields if not fields[field]]
 
         if empty_sections:
             click.echo(f"⚠️  Empty sections: {', '.join(empty_sections)}")
 
         # Validate current-context exists
-        current_context = config_data.get("current-context")
-        context_names = [c.get("name") for c in config_data.get("contexts", [])]
+        current_context = summary["current-context"]
+        context_names = summary["context_names"]
 
         if current_context and current_context not in context_names:
             click.echo(f"❌ Current context '{current_context}' not found in contexts")
@@ -540,11 +1012,13 @@ def validate(config):
         # Show summary
         click.echo(f"\n📊 Summary:")
         click.echo(f"   File: {config_path}")
-        click.echo(f"   Clusters: {len(config_data.get('clusters', []))}")
-        click.echo(f"   Users: {len(config_data.get('users', []))}")
-        click.echo(f"   Contexts: {len(config_data.get('contexts', []))}")
+        click.echo(f"   Clusters: {fields['clusters'] or 0}")
+        click.echo(f"   Users: {fields['users'] or 0}")
+        click.echo(f"   Contexts: {fields['contexts'] or 0}")
         click.echo(f"   Current context: {current_context or 'None'}")
 
+    except FileNotFoundError:
+        click.echo(f"❌ Config file not found: {config_path}")
     except Exception as e:
         click.echo(f"❌ Validation failed: {e}")
 
@@ -552,34 +1026,50 @@ def validate(config):
 @cli.command()
 def backups():
     """List available backups"""
-    manager = KubeconfigManager()
+    manager = get_manager()
 
-    if not manager.backup_dir.exists():
+    # A single directory scan; each entry caches its own stat result
+    try:
+        it = os.scandir(manager.backup_dir)
+    except FileNotFoundError:
         click.echo("❌ No backup directory found")
         return
 
-    backup_files = list(manager.backup_dir.glob("config_backup_*"))
+    backup_files = []
+    with it:
+        for entry in it:
+            if not entry.name.startswith("config_backup_"):
+                continue
+            try:
+                backup_files.append((entry.name, entry.stat().st_size))
+            except OSError:
+                # e.g. a dangling symlink; there is nothing to restore from it
+                continue
 
     if not backup_files:
         click.echo("❌ No backups found")
         return
 
-    click.echo(f"📦 Available backups in {manager.backup_dir}:\n")
+    lines = [f"📦 Available backups in {manager.backup_dir}:", ""]
 
-    for backup_file in sorted(backup_files, reverse=True):
+    for backup_name, file_size in sorted(backup_files, reverse=True):
         # Parse timestamp from filename
-        timestamp_str = backup_file.name.replace("config_backup_", "")
-        try:
-            timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-            formatted_time = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            formatted_time = timestamp_str
+        match = BACKUP_NAME_RE.match(backup_name)
+        formatted_time = backup_name.replace("config_backup_", "")
+        if match:
+            try:
+                # Reject impossible dates the same way strptime would
+                datetime(*map(int, match.groups()))
+                formatted_time = "{}-{}-{} {}:{}:{}".format(*match.groups())
+            except ValueError:
+                pass
+
+        lines.append(f"   📄 {backup_name}")
+        lines.append(f"      Created: {formatted_time}")
+        lines.append(f"      Size: {file_size} bytes")
+        lines.append("")
 
-        file_size = backup_file.stat().st_size
-        click.echo(f"   📄 {backup_file.name}")
-        click.echo(f"      Created: {formatted_time}")
-        click.echo(f"      Size: {file_size} bytes")
-        click.echo()
+    click.echo("\n".join(lines))
 
 
 @cli.command()
@@ -592,11 +1082,11 @@ def backups():
 )
 def restore(backup_name, target):
     """Restore from a backup"""
-    manager = KubeconfigManager()
+    manager = get_manager()
 
     backup_path = manager.backup_dir / backup_name
 
-    if not backup_path.exists():
+    if not backup_path.is_file():
         click.echo(f"❌ Backup not found: {backup_name}")
         click.echo("Use 'kubeconfig-manager backups' to list available backups")
         return
@@ -606,14 +1096,24 @@ def restore(backup_name, target):
     else:
         target = Path(target)
 
-    # Create a backup of current config before restoring
-    if target.exists():
-        current_backup = manager.backup_config(target)
+    # Open the backup first so nothing is touched if it cannot be read
+    with open(backup_path, "rb") as fsrc:
+        current_backup = manager.link_to_backup(target)
         if current_backup:
             click.echo(f"📦 Current config backed up to: {current_backup}")
 
-    # Restore the backup
-    shutil.copy2(backup_path, target)
+        # Restore the backup; the config is replaced in one step, never left
+        # missing, and the linked backup keeps the old file
+        manager.invalidate_config_cache(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with atomic_open(target, "wb") as fdst:
+                copy_data(fsrc, fdst)
+        except BaseException:
+            # Do not leave a backup that shares its file with the live config
+            if current_backup and os.path.samefile(current_backup, target):
+                os.unlink(current_backup)
+            raise
     click.echo(f"✅ Restored {backup_name} to {target}")
 
 
@@ -628,7 +1128,7 @@ def profile():
 @click.option("--description", "-d", help="Profile description")
 def create_profile(profile_name, description):
     """Create a new profile"""
-    manager = KubeconfigManager()
+    manager = get_manager()
     
     if manager.create_profile(profile_name, description or ""):
         click.echo(f"✅ Profile '{profile_name}' created successfully")
@@ -638,37 +1138,39 @@ def create_profile(profile_name, description):
 @profile.command("list")
 def list_profiles():
     """List all profiles"""
-    manager = KubeconfigManager()
+    manager = get_manager()
     profiles_data = manager.get_profiles()
     current_profile = profiles_data.get("current_profile", "default")
     
-    click.echo("📋 Available profiles:\n")
+    lines = ["📋 Available profiles:", ""]
     
     # Show default profile
     marker = "👉" if current_profile == "default" else "  "
-    click.echo(f"{marker} default (system default)")
+    lines.append(f"{marker} default (system default)")
     
     # Show custom profiles
     for name, info in profiles_data.get("profiles", {}).items():
         marker = "👉" if current_profile == name else "  "
         description = info.get("description", "")
         created = info.get("created", "")
-        click.echo(f"{marker} {name}")
+        lines.append(f"{marker} {name}")
         if description:
-            click.echo(f"     Description: {description}")
+            lines.append(f"     Description: {description}")
         if created:
             try:
                 created_date = datetime.fromisoformat(created).strftime("%Y-%m-%d %H:%M")
-                click.echo(f"     Created: {created_date}")
+                lines.append(f"     Created: {created_date}")
             except ValueError:
                 pass
-        click.echo()
+        lines.append("")
+    
+    click.echo("\n".join(lines))
 
 @profile.command("switch")
 @click.argument("profile_name")
 def switch_profile_cmd(profile_name):
     """Switch to a different profile"""
-    manager = KubeconfigManager()
+    manager = get_manager()
     
     if manager.switch_profile(profile_name):
         click.echo(f"🔄 Switched to profile: {profile_name}")
@@ -683,7 +1185,7 @@ def switch_profile_cmd(profile_name):
 @profile.command("current")
 def current_profile():
     """Show current active profile"""
-    manager = KubeconfigManager()
+    manager = get_manager()
     current = manager.get_current_profile()
     config_path = manager.get_current_config_path()
     
@@ -702,7 +1204,7 @@ def current_profile():
 @click.confirmation_option(prompt="Are you sure you want to delete this profile?")
 def delete_profile(profile_name):
     """Delete a profile"""
-    manager = KubeconfigManager()
+    manager = get_manager()
     
     if profile_name == "default":
         click.echo("❌ Cannot delete the default profile")
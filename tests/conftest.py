@@ -0,0 +1,13 @@
+"""
+Load kubeconfig-manager.py once, as the kubeconfig_manager module the tests import
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent.parent / "kubeconfig-manager.py"
+spec = importlib.util.spec_from_file_location("kubeconfig_manager", SCRIPT)
+kcm = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = kcm
+spec.loader.exec_module(kcm)
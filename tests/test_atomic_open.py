@@ -0,0 +1,33 @@
+"""
+atomic_open must replace a file without changing its mode or owner
+"""
+
+import os
+
+import kubeconfig_manager as kcm
+
+
+def test_replace_keeps_mode_and_owner(tmp_path):
+    path = tmp_path / "config"
+    path.write_text("old\n")
+    os.chmod(path, 0o600)
+    # As root (the `sudo kcman ...` case) hand the file to another user first
+    owner = (1234, 1234) if os.geteuid() == 0 else (os.getuid(), os.getgid())
+    os.chown(path, *owner)
+
+    with kcm.atomic_open(path) as f:
+        f.write("new\n")
+
+    st = os.stat(path)
+    assert path.read_text() == "new\n"
+    assert st.st_mode & 0o7777 == 0o600
+    assert (st.st_uid, st.st_gid) == owner
+
+
+def test_new_file_is_private(tmp_path):
+    path = tmp_path / "config"
+    with kcm.atomic_open(path) as f:
+        f.write("new\n")
+
+    assert path.read_text() == "new\n"
+    assert os.stat(path).st_mode & 0o777 == 0o600
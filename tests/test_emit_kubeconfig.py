@@ -0,0 +1,105 @@
+"""
+emit_kubeconfig must produce exactly what yaml.dump writes with YAML_DUMP_OPTIONS
+"""
+
+import random
+
+import yaml
+
+import kubeconfig_manager as kcm
+
+kcm.import_yaml()
+
+
+class PureDumper(yaml.SafeDumper):
+    def ignore_aliases(self, data) -> bool:
+        return True
+
+
+DUMPERS = [kcm._Dumper, PureDumper]
+
+# Scalars the emitter has to get right, quoting included
+TRICKY = [
+    "", " ", "a", "x y", "...", "...x", "---", "---x", "--", "-", "-x", "..",
+    ".", "./a", "a:b", "a: b", "a:", ":a", "#a", "a #b", "a#b", "@a", "a@b",
+    "=", "+1", "1", "1.5", "0x1f", "0o17", "1e3", ".inf", ".nan", "~", "null",
+    "Null", "true", "yes", "No", "on", "OFF", "y", "2024-01-01", "12:30",
+    "1_000", "a\tb", "café", "ü", "a\u2028b", "a\u2029b", "a\x85b", "a\nb",
+    "a\rb", "'", '"', "a'b", "a\"b", "\\", "%a", "!a", "&a", "*a", "|", ">",
+    "?", "? a", "{", "}", "[", "]", ",", "a,b", "https://example.com:6443",
+    "system:masters", "arn:aws:eks:us-east-1:123:cluster/x", "x" * 130,
+    None, True, False, 0, 42, -7,
+]
+KEYS = [
+    "name", "cluster", "server", "certificate-authority-data", "user",
+    "namespace", "...", "...x", "---", "a:b", "x" * 130, "café", "1", "true",
+    "a b", "",
+]
+
+
+def random_scalar(rng):
+    if rng.random() < 0.6:
+        return rng.choice(TRICKY)
+    # Line breaks make the emitter fall back, so they are left to TRICKY
+    alphabet = "abcXYZ019 _-.:/@+=#'\"\\\t \xa0é{}[],&*!|>?%~"
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+
+
+def random_value(rng, depth):
+    roll = rng.random()
+    if depth >= 4 or roll < 0.5:
+        return random_scalar(rng)
+    if roll < 0.6:
+        return rng.choice([{}, []])
+    if roll < 0.8:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(1, 4))]
+    return {
+        rng.choice(KEYS): random_value(rng, depth + 1)
+        for _ in range(rng.randint(1, 4))
+    }
+
+
+def random_config(rng):
+    return {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [
+            {"name": random_scalar(rng), "cluster": random_value(rng, 1)}
+            for _ in range(rng.randint(0, 3))
+        ],
+        "contexts": [
+            {"name": random_scalar(rng), "context": random_value(rng, 1)}
+            for _ in range(rng.randint(0, 3))
+        ],
+        "current-context": random_scalar(rng),
+        rng.choice(KEYS): random_value(rng, 1),
+    }
+
+
+def check(config):
+    # The emitter quotes through kcm._Dumper, so compare it against each backend
+    # in turn (libyaml and pure Python escape some characters differently)
+    default_dumper = kcm._Dumper
+    try:
+        for dumper in DUMPERS:
+            kcm._Dumper = dumper
+            text = kcm.emit_kubeconfig(config)
+            if text is not None:
+                expected = yaml.dump(config, Dumper=dumper, **kcm.YAML_DUMP_OPTIONS)
+                assert text == expected, (dumper.__name__, config)
+    finally:
+        kcm._Dumper = default_dumper
+
+
+def test_tricky_scalars():
+    for value in TRICKY:
+        check({"current-context": value})
+        check({"contexts": [{"name": value}]})
+    for key in KEYS:
+        check({key: "x"})
+
+
+def test_random_configs():
+    rng = random.Random(20240101)
+    for _ in range(3000):
+        check(random_config(rng))
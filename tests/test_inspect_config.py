@@ -0,0 +1,47 @@
+"""
+inspect_config must summarize a kubeconfig the same way load_config reads it
+"""
+
+import kubeconfig_manager as kcm
+
+
+def inspect(tmp_path, text: str):
+    path = tmp_path / "config"
+    path.write_text(text)
+    manager = kcm.KubeconfigManager()
+    return manager.inspect_config(path), manager.load_config(path)
+
+
+def test_summary_matches_loaded_config(tmp_path):
+    summary, config = inspect(
+        tmp_path,
+        "apiVersion: v1\n"
+        "clusters:\n"
+        "- name: c1\n"
+        "users: []\n"
+        "contexts:\n"
+        "- name: x1\n"
+        "- name: x2\n"
+        "current-context: x2\n",
+    )
+    assert summary["fields"] == {
+        "apiVersion": "v1", "clusters": 1, "users": 0, "contexts": 2, "current-context": "x2",
+    }
+    assert summary["context_names"] == [c["name"] for c in config["contexts"]]
+    assert summary["current-context"] == config["current-context"]
+
+
+def test_merge_keys(tmp_path):
+    summary, config = inspect(
+        tmp_path,
+        "base: &b {name: x1}\n"
+        "top: &t {current-context: x1}\n"
+        "<<: *t\n"
+        "contexts:\n"
+        "- <<: *b\n"
+        "  context: {cluster: c1, user: u1}\n",
+    )
+    assert summary["context_names"] == ["x1"]
+    assert summary["current-context"] == "x1"
+    assert summary["context_names"] == [c["name"] for c in config["contexts"]]
+    assert summary["current-context"] == config["current-context"]
@@ -0,0 +1,84 @@
+"""
+set_current_context_inplace must rewrite only the current-context line, and
+leave the file untouched whenever that line cannot be replaced safely
+"""
+
+import yaml
+
+import kubeconfig_manager as kcm
+
+CONFIG = (
+    "apiVersion: v1\n"
+    "kind: Config\n"
+    "contexts:\n"
+    "- name: a\n"
+    "- name: b c\n"
+    "current-context: a\n"
+    "preferences: {}\n"
+)
+
+
+def switch(tmp_path, data: bytes, context_name: str):
+    path = tmp_path / "config"
+    path.write_bytes(data)
+    switched = kcm.KubeconfigManager().set_current_context_inplace(path, context_name)
+    return switched, path.read_bytes()
+
+
+def test_rewrites_current_context_line(tmp_path):
+    switched, data = switch(tmp_path, CONFIG.encode(), "b c")
+    assert switched
+    assert data == CONFIG.replace("current-context: a", "current-context: b c").encode()
+    assert yaml.safe_load(data)["current-context"] == "b c"
+
+
+def test_keeps_crlf_line_endings(tmp_path):
+    original = CONFIG.replace("\n", "\r\n").encode()
+    switched, data = switch(tmp_path, original, "b c")
+    assert switched
+    assert data == original.replace(b"current-context: a", b"current-context: b c")
+    assert yaml.safe_load(data)["current-context"] == "b c"
+
+
+def test_missing_key(tmp_path):
+    original = CONFIG.replace("current-context: a\n", "").encode()
+    assert switch(tmp_path, original, "b c") == (False, original)
+
+
+def test_value_on_next_line(tmp_path):
+    original = CONFIG.replace("current-context: a", "current-context:\n  a").encode()
+    assert switch(tmp_path, original, "b c") == (False, original)
+
+
+def test_anchored_value(tmp_path):
+    original = (
+        CONFIG.replace("current-context: a", "current-context: &x a") + "foo: *x\n"
+    ).encode()
+    assert switch(tmp_path, original, "b c") == (False, original)
+
+
+def test_flow_style_file(tmp_path):
+    original = (
+        "{\n"
+        "current-context: a,\n"
+        "contexts: [{name: a}, {name: b c}]\n"
+        "}\n"
+    ).encode()
+    assert switch(tmp_path, original, "b c") == (False, original)
+
+
+def test_line_inside_quoted_scalar(tmp_path):
+    original = CONFIG.replace("current-context: a\n", 'note: "x\ncurrent-context: a"\n').encode()
+    assert switch(tmp_path, original, "b c") == (False, original)
+
+
+def test_line_inside_flow_sequence(tmp_path):
+    original = CONFIG.replace("current-context: a\n", "extra: [\ncurrent-context: a\n]\n").encode()
+    assert switch(tmp_path, original, "b c") == (False, original)
+
+
+def test_empty_value_with_comment(tmp_path):
+    original = CONFIG.replace("current-context: a", "current-context: # unset").encode()
+    switched, data = switch(tmp_path, original, "b c")
+    assert switched
+    assert yaml.safe_load(data)["current-context"] == "b c"